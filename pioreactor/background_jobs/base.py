@@ -442,6 +442,36 @@ class _BackgroundJob(metaclass=PostInitCaller):
             see pioreactor.pubsub.QOS
         """
 
+        assert callable(
+            callback
+        ), "callback should be callable - do you need to change the order of arguments?"
+
+        subscriptions = [subscriptions] if isinstance(subscriptions, str) else subscriptions
+
+        self.subscribe_and_callbacks(
+            {str(topic): callback for topic in subscriptions}, allow_retained=allow_retained, qos=qos
+        )
+
+    def subscribe_and_callbacks(
+        self,
+        topics_to_callbacks: dict[str, t.Callable[[pt.MQTTMessage], None]],
+        allow_retained: bool = True,
+        qos: int = QOS.EXACTLY_ONCE,
+    ) -> None:
+        """
+        Like subscribe_and_callback, but with a (possibly different) callback per topic. All topics are
+        subscribed to with a single SUBSCRIBE packet, rather than a round trip to the broker per topic.
+
+        Parameters
+        -------------
+        topics_to_callbacks: dict of topic to callable
+            Callbacks only accept a single parameter, message.
+        allow_retained: bool
+            see subscribe_and_callback
+        qos: int
+            see pioreactor.pubsub.QOS
+        """
+
         def wrap_callback(actual_callback: t.Callable[..., T]) -> t.Callable[..., t.Optional[T]]:
             def _callback(client, userdata, message: pt.MQTTMessage) -> t.Optional[T]:
                 if not allow_retained and message.retain:
@@ -455,15 +485,18 @@ class _BackgroundJob(metaclass=PostInitCaller):
 
             return _callback
 
-        assert callable(
-            callback
-        ), "callback should be callable - do you need to change the order of arguments?"
+        if not topics_to_callbacks:
+            return
 
-        subscriptions = [subscriptions] if isinstance(subscriptions, str) else subscriptions
+        for topic, callback in topics_to_callbacks.items():
+            self.sub_client.message_callback_add(topic, wrap_callback(callback))
+
+        from paho.mqtt.enums import MQTTErrorCode as mqtt
+        from paho.mqtt.client import error_string
 
-        for topic in subscriptions:
-            self.sub_client.message_callback_add(str(topic), wrap_callback(callback))
-            self.sub_client.subscribe(str(topic), qos=qos)
+        result, _ = self.sub_client.subscribe([(topic, qos) for topic in topics_to_callbacks])
+        if result != mqtt.MQTT_ERR_SUCCESS:
+            self.logger.error(f"Unable to subscribe to {list(topics_to_callbacks)}: {error_string(result)}")
         return
 
     def set_state(self, new_state: pt.JobState) -> None:
@@ -2,15 +2,18 @@
 from __future__ import annotations
 
 import time
-from contextlib import suppress
 from datetime import datetime
+from datetime import timedelta
+from functools import cache
+from functools import cached_property
 from functools import partial
+from threading import Lock
 from threading import Thread
 from typing import cast
 from typing import Optional
 
 import click
-from msgspec.json import decode
+from msgspec.json import Decoder
 
 from pioreactor import exc
 from pioreactor import structs
@@ -30,6 +33,13 @@ from pioreactor.utils.timing import current_utc_datetime
 from pioreactor.utils.timing import RepeatedTimer
 
 
+# decoders are reused, so the schema is built once rather than on every message.
+growth_rate_decoder = Decoder(structs.GrowthRate)
+od_filtered_decoder = Decoder(structs.ODFiltered)
+od_readings_decoder = Decoder(structs.ODReadings)
+dosing_event_decoder = Decoder(structs.DosingEvent)
+
+
 def close(x: float, y: float) -> bool:
     return abs(x - y) < 1e-9
 
@@ -83,7 +93,11 @@ class ThroughputCalculator:
 
 
 class LiquidVolumeCalculator:
-    max_volume = config.getfloat("bioreactor", "max_volume_ml")
+    @staticmethod
+    @cache
+    def max_volume() -> float:
+        # read lazily (and only once), so importing this module doesn't touch the config.
+        return config.getfloat("bioreactor", "max_volume_ml")
 
     @classmethod
     def update(cls, new_dosing_event: structs.DosingEvent, current_liquid_volume: float) -> float:
@@ -97,14 +111,14 @@ class LiquidVolumeCalculator:
             if new_dosing_event.source_of_event == "manually":
                 # we assume the user has extracted what they want, regardless of level or tube height.
                 return max(current_liquid_volume - volume, 0.0)
-            elif current_liquid_volume <= cls.max_volume:
+            elif current_liquid_volume <= cls.max_volume():
                 # if the current volume is less than the outflow tube, no liquid is removed
                 return current_liquid_volume
             else:
                 # since we do some additional "removing" after adding, we don't want to
                 # count that as being removed (total volume is limited by position of outflow tube).
                 # hence we keep an lowerbound here.
-                return max(current_liquid_volume - volume, cls.max_volume)
+                return max(current_liquid_volume - volume, cls.max_volume())
         else:
             raise ValueError("Unknown event type")
 
@@ -141,9 +155,8 @@ class AltMediaFractionCalculator:
                 current_alt_media_fraction, volume, 0, current_liquid_volume
             )
 
-    @classmethod
+    @staticmethod
     def _update_alt_media_fraction(
-        cls,
         current_alt_media_fraction: float,
         media_delta: float,
         alt_media_delta: float,
@@ -151,11 +164,10 @@ class AltMediaFractionCalculator:
     ) -> float:
         assert media_delta >= 0
         assert alt_media_delta >= 0
-        total_addition = media_delta + alt_media_delta
+        new_liquid_volume = current_liquid_volume + media_delta + alt_media_delta
 
         return round(
-            (current_alt_media_fraction * current_liquid_volume + alt_media_delta)
-            / (current_liquid_volume + total_addition),
+            (current_alt_media_fraction * current_liquid_volume + alt_media_delta) / new_liquid_volume,
             10,
         )
 
@@ -189,8 +201,10 @@ class DosingAutomationJob(AutomationJob):
     _latest_od: Optional[dict[pt.PdChannel, float]] = None
 
     latest_event: Optional[events.AutomationEvent] = None
+    _STALE_THRESHOLD = timedelta(minutes=5)  # readings older than this are considered stale
     _latest_run_at: Optional[datetime] = None
-    run_thread: RepeatedTimer | Thread
+    _latest_run_at_monotonic: Optional[float] = None  # used for scheduling, as it's robust to system clock changes
+    run_thread: Optional[RepeatedTimer | Thread] = None
     duration: float | None
 
     # overwrite to use your own dosing programs.
@@ -210,14 +224,20 @@ class DosingAutomationJob(AutomationJob):
     media_throughput: float  # amount of media that has been expelled
     alt_media_throughput: float  # amount of alt-media that has been expelled
     liquid_volume: float  # amount in the vial
-    MAX_VIAL_VOLUME_TO_STOP: float = config.getfloat(
-        "dosing_automation.config", "max_volume_to_stop", fallback=18.0
-    )
-    MAX_VIAL_VOLUME_TO_WARN: float = 0.95 * MAX_VIAL_VOLUME_TO_STOP
 
-    MAX_SUBDOSE = config.getfloat(
-        "dosing_automation.config", "max_subdose", fallback=1.0
-    )  # arbitrary, but should be some value that the pump is well calibrated for.
+    # these are read from config on first access (not at import), and can be overwritten in subclasses.
+    @cached_property
+    def MAX_VIAL_VOLUME_TO_STOP(self) -> float:
+        return config.getfloat("dosing_automation.config", "max_volume_to_stop", fallback=18.0)
+
+    @cached_property
+    def MAX_VIAL_VOLUME_TO_WARN(self) -> float:
+        return 0.95 * self.MAX_VIAL_VOLUME_TO_STOP
+
+    @cached_property
+    def MAX_SUBDOSE(self) -> float:
+        # arbitrary, but should be some value that the pump is well calibrated for.
+        return config.getfloat("dosing_automation.config", "max_subdose", fallback=1.0)
 
     def __init_subclass__(cls, **kwargs) -> None:
         super().__init_subclass__(**kwargs)
@@ -232,14 +252,22 @@ class DosingAutomationJob(AutomationJob):
         experiment: str,
         duration: Optional[float] = None,
         skip_first_run: bool = False,
-        initial_alt_media_fraction: float = config.getfloat(
-            "bioreactor", "initial_alt_media_fraction", fallback=0.0
-        ),
-        initial_liquid_volume: float = config.getfloat("bioreactor", "initial_volume_ml", fallback=14),
+        initial_alt_media_fraction: Optional[float] = None,
+        initial_liquid_volume: Optional[float] = None,
         **kwargs,
     ) -> None:
         super(DosingAutomationJob, self).__init__(unit, experiment)
 
+        # guards the (value, timestamp) pairs written by the MQTT callbacks and read in `execute`.
+        self._readings_lock = Lock()
+
+        if initial_alt_media_fraction is None:
+            initial_alt_media_fraction = config.getfloat(
+                "bioreactor", "initial_alt_media_fraction", fallback=0.0
+            )
+        if initial_liquid_volume is None:
+            initial_liquid_volume = config.getfloat("bioreactor", "initial_volume_ml", fallback=14)
+
         self.skip_first_run = skip_first_run
 
         self.latest_normalized_od_at = current_utc_datetime()
@@ -250,22 +278,29 @@ class DosingAutomationJob(AutomationJob):
         self._init_volume_throughput()
         self._init_liquid_volume(float(initial_liquid_volume))
 
+        # the kwargs execute_io_action accepts, ex: `salty_media_ml` for `add_salty_media_to_bioreactor`.
+        self._registered_pump_kwargs = frozenset(
+            name.removeprefix("add_").removesuffix("_to_bioreactor") + "_ml"
+            for name in dir(self)
+            if name.startswith("add_") and name.endswith("_to_bioreactor")
+        )
+
         self.set_duration(duration)
 
     def set_duration(self, duration: Optional[float]) -> None:
         if duration:
             self.duration = float(duration)
 
-            with suppress(AttributeError):
-                self.run_thread.cancel()  # type: ignore
+            if isinstance(self.run_thread, RepeatedTimer):
+                self.run_thread.cancel()
 
-            if self._latest_run_at is not None:
+            if self._latest_run_at_monotonic is not None:
                 # what's the correct logic when changing from duration N and duration M?
                 # - N=20, and it's been 5m since the last run (or initialization). I change to M=30, I should wait M-5 minutes.
                 # - N=60, and it's been 50m since last run. I change to M=30, I should run immediately.
                 run_after = max(
-                    0,
-                    (self.duration * 60) - (current_utc_datetime() - self._latest_run_at).seconds,
+                    0.0,
+                    (self.duration * 60) - (time.monotonic() - self._latest_run_at_monotonic),
                 )
             else:
                 # there is a race condition here: self.run() will run immediately (see run_immediately), but the state of the job is not READY, since
@@ -277,7 +312,7 @@ class DosingAutomationJob(AutomationJob):
                 self.duration * 60,
                 self.run,
                 job_name=self.job_name,
-                run_immediately=(not self.skip_first_run) or (self._latest_run_at is not None),
+                run_immediately=(not self.skip_first_run) or (self._latest_run_at_monotonic is not None),
                 run_after=run_after,
             ).start()
 
@@ -298,33 +333,32 @@ class DosingAutomationJob(AutomationJob):
         event: Optional[events.AutomationEvent]
 
         self._latest_run_at = current_utc_datetime()
+        self._latest_run_at_monotonic = time.monotonic()
 
-        if self.state == self.DISCONNECTED:
-            # NOOP
-            # we ended early.
-            return None
+        # wait up to `timeout` seconds for READY, and if not unpaused, just move on.
+        while self.state != self.READY:
+            if self.state == self.DISCONNECTED:
+                # NOOP
+                # we ended early.
+                return None
 
-        elif self.state != self.READY:
-            sleep_for = brief_pause()
-            # wait a 60s, and if not unpaused, just move on.
-            if (timeout - sleep_for) <= 0:
+            timeout -= brief_pause()
+            if timeout <= 0:
                 self.logger.debug("Timed out waiting for READY.")
                 return None
-            else:
-                return self.run(timeout=timeout - sleep_for)
-        else:
-            # we are in READY
-            try:
-                event = self.execute()
-
-            except exc.JobRequiredError as e:
-                self.logger.debug(e, exc_info=True)
-                self.logger.warning(e)
-                event = events.ErrorOccurred(str(e))
-            except Exception as e:
-                self.logger.debug(e, exc_info=True)
-                self.logger.error(e)
-                event = events.ErrorOccurred(str(e))
+
+        # we are in READY
+        try:
+            event = self.execute()
+
+        except exc.JobRequiredError as e:
+            self.logger.debug(e, exc_info=True)
+            self.logger.warning(e)
+            event = events.ErrorOccurred(str(e))
+        except Exception as e:
+            self.logger.debug(e, exc_info=True)
+            self.logger.error(e)
+            event = events.ErrorOccurred(str(e))
 
         if event:
             self.logger.info(event.display())
@@ -373,6 +407,10 @@ class DosingAutomationJob(AutomationJob):
         A problem is if the there is skew in the different mLs, then it's possible that one or more pumps
         most dose a very small amount, where our pumps have poor accuracy.
 
+        Volumes above MAX_SUBDOSE are split into sub-doses by `_execute_io_action`, not by calling
+        `execute_io_action` again. A subclass that overrides `execute_io_action` is called once per
+        request, not once per sub-dose.
+
 
         Returns
         ---------
@@ -384,6 +422,20 @@ class DosingAutomationJob(AutomationJob):
                 "all kwargs should end in `_ml`. Example: `execute_io_action(salty_media_ml=1.0)`"
             )
 
+        # only pumps that will actually run need a pump function. Check them all before any liquid is moved.
+        unknown_pumps_ml = [
+            pump
+            for pump, volume_ml in other_pumps_ml.items()
+            if volume_ml > 0
+            and pump not in self._registered_pump_kwargs
+            # pump functions can also be set up after __init__
+            and not hasattr(self, f"add_{pump.removesuffix('_ml')}_to_bioreactor")
+        ]
+        if unknown_pumps_ml:
+            raise AttributeError(
+                f"No pump function found for {sorted(unknown_pumps_ml)}. For a kwarg `<name>_ml`, define `add_<name>_to_bioreactor`."
+            )
+
         all_pumps_ml = {**{"media_ml": media_ml, "alt_media_ml": alt_media_ml}, **other_pumps_ml}
 
         sum_of_volumes = sum(ml for ml in all_pumps_ml.values())
@@ -393,18 +445,23 @@ class DosingAutomationJob(AutomationJob):
                 "Not removing enough waste: waste_ml should be greater than or equal to sum of all dosed ml"
             )
 
-        volumes_moved = SummableDict(waste_ml=0.0, **{p: 0.0 for p in all_pumps_ml})
+        volumes_moved = {"waste_ml": 0.0, **{p: 0.0 for p in all_pumps_ml}}
+        self._execute_io_action(volumes_moved, waste_ml, all_pumps_ml)
+        return SummableDict(volumes_moved)
+
+    def _execute_io_action(
+        self, volumes_moved: dict[str, float], waste_ml: float, all_pumps_ml: dict[str, float]
+    ) -> None:
+        """
+        Recursive part of `execute_io_action`. Volumes actually moved are accumulated, in place, into `volumes_moved`.
+        """
+        sum_of_volumes = sum(all_pumps_ml.values())
         source_of_event = f"{self.job_name}:{self.automation_name}"
 
         if sum_of_volumes > self.MAX_SUBDOSE:
-            volumes_moved += self.execute_io_action(
-                waste_ml=sum_of_volumes / 2,
-                **{pump: volume_ml / 2 for pump, volume_ml in all_pumps_ml.items()},
-            )
-            volumes_moved += self.execute_io_action(
-                waste_ml=sum_of_volumes / 2,
-                **{pump: volume_ml / 2 for pump, volume_ml in all_pumps_ml.items()},
-            )
+            half_pumps_ml = {pump: volume_ml / 2 for pump, volume_ml in all_pumps_ml.items()}
+            self._execute_io_action(volumes_moved, sum_of_volumes / 2, half_pumps_ml)
+            self._execute_io_action(volumes_moved, sum_of_volumes / 2, half_pumps_ml)
 
         else:
             # iterate through pumps, and dose required amount. First media, then alt_media, then any others, then waste.
@@ -464,103 +521,117 @@ class DosingAutomationJob(AutomationJob):
                     )
                     briefer_pause()
 
-        return volumes_moved
-
     @property
     def most_stale_time(self) -> datetime:
         return min(self.latest_normalized_od_at, self.latest_growth_rate_at, self.latest_od_at)
 
     @property
     def latest_growth_rate(self) -> float:
+        with self._readings_lock:
+            latest_growth_rate, most_stale_time = self._latest_growth_rate, self.most_stale_time
+
         # check if None
-        if self._latest_growth_rate is None:
+        if latest_growth_rate is None:
             # this should really only happen on the initialization.
             self.logger.debug("Waiting for OD and growth rate data to arrive")
             if not all(is_pio_job_running(["od_reading", "growth_rate_calculating"])):
                 raise exc.JobRequiredError("`od_reading` and `growth_rate_calculating` should be Ready.")
 
         # check most stale time
-        if (current_utc_datetime() - self.most_stale_time).seconds > 5 * 60:
+        if current_utc_datetime() - most_stale_time > self._STALE_THRESHOLD:
             raise exc.JobRequiredError(
-                f"readings are too stale (over 5 minutes old) - are `od_reading` and `growth_rate_calculating` running?. Last reading occurred at {self.most_stale_time}."
+                f"readings are too stale (over {self._STALE_THRESHOLD.total_seconds() / 60:g} minutes old) - are `od_reading` and `growth_rate_calculating` running?. Last reading occurred at {most_stale_time}."
             )
 
-        return cast(float, self._latest_growth_rate)
+        return cast(float, latest_growth_rate)
 
     @property
     def latest_normalized_od(self) -> float:
+        with self._readings_lock:
+            latest_normalized_od, most_stale_time = self._latest_normalized_od, self.most_stale_time
+
         # check if None
-        if self._latest_normalized_od is None:
+        if latest_normalized_od is None:
             # this should really only happen on the initialization.
             self.logger.debug("Waiting for OD and growth rate data to arrive")
             if not all(is_pio_job_running(["od_reading", "growth_rate_calculating"])):
                 raise exc.JobRequiredError("`od_reading` and `growth_rate_calculating` should be Ready.")
 
         # check most stale time
-        if (current_utc_datetime() - self.most_stale_time).seconds > 5 * 60:
+        if current_utc_datetime() - most_stale_time > self._STALE_THRESHOLD:
             raise exc.JobRequiredError(
-                f"readings are too stale (over 5 minutes old) - are `od_reading` and `growth_rate_calculating` running?. Last reading occurred at {self.most_stale_time}."
+                f"readings are too stale (over {self._STALE_THRESHOLD.total_seconds() / 60:g} minutes old) - are `od_reading` and `growth_rate_calculating` running?. Last reading occurred at {most_stale_time}."
             )
 
-        return cast(float, self._latest_normalized_od)
+        return cast(float, latest_normalized_od)
 
     @property
     def latest_od(self) -> dict[pt.PdChannel, float]:
+        with self._readings_lock:
+            latest_od, latest_od_at = self._latest_od, self.latest_od_at
+
         # check if None
-        if self._latest_od is None:
+        if latest_od is None:
             # this should really only happen on the initialization.
             self.logger.debug("Waiting for OD and growth rate data to arrive")
             if not is_pio_job_running("od_reading"):
                 raise exc.JobRequiredError("`od_reading` should be Ready.")
 
         # check most stale time
-        if (current_utc_datetime() - self.latest_od_at).seconds > 5 * 60:
+        if current_utc_datetime() - latest_od_at > self._STALE_THRESHOLD:
             raise exc.JobRequiredError(
-                f"readings are too stale (over 5 minutes old) - is `od_reading` running?. Last reading occurred at {self.latest_od_at}."
+                f"readings are too stale (over {self._STALE_THRESHOLD.total_seconds() / 60:g} minutes old) - is `od_reading` running?. Last reading occurred at {latest_od_at}."
             )
 
-        assert self._latest_od is not None
-        return self._latest_od
+        assert latest_od is not None
+        return latest_od
 
     ########## Private & internal methods
 
     def on_disconnected(self) -> None:
-        with suppress(AttributeError):
-            self.run_thread.join(
-                timeout=10
-            )  # thread has N seconds to end. If not, something is wrong, like a while loop in execute that isn't stopping.
-            if self.run_thread.is_alive():
-                self.logger.debug("run_thread still alive!")
+        if self.run_thread is None:
+            # __init__ didn't get far enough to start it.
+            return
+
+        self.run_thread.join(
+            timeout=10
+        )  # thread has N seconds to end. If not, something is wrong, like a while loop in execute that isn't stopping.
+        if self.run_thread.is_alive():
+            self.logger.debug("run_thread still alive!")
 
     def _set_growth_rate(self, message: pt.MQTTMessage) -> None:
         if not message.payload:
             return
 
-        self.previous_growth_rate = self._latest_growth_rate
-        payload = decode(message.payload, type=structs.GrowthRate)
-        self._latest_growth_rate = payload.growth_rate
-        self.latest_growth_rate_at = payload.timestamp
+        payload = growth_rate_decoder.decode(message.payload)
+        with self._readings_lock:
+            self.previous_growth_rate = self._latest_growth_rate
+            self._latest_growth_rate = payload.growth_rate
+            self.latest_growth_rate_at = payload.timestamp
 
     def _set_normalized_od(self, message: pt.MQTTMessage) -> None:
         if not message.payload:
             return
 
-        self.previous_normalized_od = self._latest_normalized_od
-        payload = decode(message.payload, type=structs.ODFiltered)
-        self._latest_normalized_od = payload.od_filtered
-        self.latest_normalized_od_at = payload.timestamp
+        payload = od_filtered_decoder.decode(message.payload)
+        with self._readings_lock:
+            self.previous_normalized_od = self._latest_normalized_od
+            self._latest_normalized_od = payload.od_filtered
+            self.latest_normalized_od_at = payload.timestamp
 
     def _set_ods(self, message: pt.MQTTMessage) -> None:
         if not message.payload:
             return
 
-        self.previous_od = self._latest_od
-        payload = decode(message.payload, type=structs.ODReadings)
-        self._latest_od: dict[pt.PdChannel, float] = {c: payload.ods[c].od for c in payload.ods}
-        self.latest_od_at = payload.timestamp
+        payload = od_readings_decoder.decode(message.payload)
+        latest_od: dict[pt.PdChannel, float] = {c: payload.ods[c].od for c in payload.ods}
+        with self._readings_lock:
+            self.previous_od = self._latest_od
+            self._latest_od = latest_od
+            self.latest_od_at = payload.timestamp
 
     def _update_dosing_metrics(self, message: pt.MQTTMessage) -> None:
-        dosing_event = decode(message.payload, type=structs.DosingEvent)
+        dosing_event = dosing_event_decoder.decode(message.payload)
         self._update_alt_media_fraction(dosing_event)
         self._update_throughput(dosing_event)
         self._update_liquid_volume(dosing_event)
@@ -662,21 +733,14 @@ class DosingAutomationJob(AutomationJob):
         return
 
     def start_passive_listeners(self) -> None:
-        self.subscribe_and_callback(
-            self._set_normalized_od,
-            f"pioreactor/{self.unit}/{self.experiment}/growth_rate_calculating/od_filtered",
-        )
-        self.subscribe_and_callback(
-            self._set_growth_rate,
-            f"pioreactor/{self.unit}/{self.experiment}/growth_rate_calculating/growth_rate",
-        )
-        self.subscribe_and_callback(
-            self._set_ods,
-            f"pioreactor/{self.unit}/{self.experiment}/od_reading/ods",
-        )
-        self.subscribe_and_callback(
-            self._update_dosing_metrics,
-            f"pioreactor/{self.unit}/{self.experiment}/dosing_events",
+        prefix = f"pioreactor/{self.unit}/{self.experiment}"
+        self.subscribe_and_callbacks(
+            {
+                f"{prefix}/growth_rate_calculating/od_filtered": self._set_normalized_od,
+                f"{prefix}/growth_rate_calculating/growth_rate": self._set_growth_rate,
+                f"{prefix}/od_reading/ods": self._set_ods,
+                f"{prefix}/dosing_events": self._update_dosing_metrics,
+            }
         )
 
 
@@ -696,11 +760,10 @@ def start_dosing_automation(
 
     unit = unit or whoami.get_unit_name()
     experiment = experiment or whoami.get_assigned_experiment_name(unit)
-    try:
-        klass = available_dosing_automations[automation_name]
-    except KeyError:
+    klass = available_dosing_automations.get(automation_name)
+    if klass is None:
         raise KeyError(
-            f"Unable to find {automation_name}. Available automations are {list( available_dosing_automations.keys())}"
+            f"Unable to find {automation_name}. Available automations are {', '.join(available_dosing_automations)}"
         )
 
     try:
@@ -744,12 +807,15 @@ def click_dosing_automation(ctx, automation_name, duration, skip_first_run):
     """
     Start an Dosing automation
     """
+    names, values = ctx.args[::2], ctx.args[1::2]
+    if len(names) != len(values) or not all(name.startswith("--") for name in names):
+        raise click.BadArgumentUsage("Automation settings should be provided as `--<setting> <value>` pairs.")
 
     la = start_dosing_automation(
         automation_name=automation_name,
         duration=float(duration),
         skip_first_run=bool(skip_first_run),
-        **{ctx.args[i][2:].replace("-", "_"): ctx.args[i + 1] for i in range(0, len(ctx.args), 2)},
+        **{name[2:].replace("-", "_"): value for name, value in zip(names, values)},
     )
 
     la.block_until_disconnected()
@@ -38,13 +38,19 @@ from __future__ import annotations
 
 from collections import defaultdict
 from datetime import datetime
-from json import dumps, loads
+from math import exp
+from math import isfinite
+from queue import Empty
+from queue import Queue
+from time import monotonic
 from time import sleep
 from typing import Generator
+from typing import TYPE_CHECKING
 
 import click
 from msgspec import DecodeError
-from msgspec.json import decode
+from msgspec.json import Decoder
+from msgspec.json import encode
 
 from pioreactor import structs
 from pioreactor import types as pt
@@ -53,11 +59,19 @@ from pioreactor.actions.od_blank import od_statistics
 from pioreactor.background_jobs.base import BackgroundJob
 from pioreactor.background_jobs.od_reading import VALID_PD_ANGLES
 from pioreactor.config import config
-from pioreactor.pubsub import QOS, subscribe, publish
+from pioreactor.pubsub import QOS, subscribe, subscribe_and_callback
 from pioreactor.utils import local_persistant_storage
 from pioreactor.utils.streaming_calculations import CultureGrowthUKF
-import numpy as np
 
+if TYPE_CHECKING:
+    import numpy as np
+
+
+# decoders are reused, so the schema is built once rather than on every message.
+od_readings_decoder = Decoder(structs.ODReadings)
+dosing_event_decoder = Decoder(structs.DosingEvent)
+# od_blank, od_normalization_mean and od_normalization_variance are cached as json strings of channel -> float.
+od_statistics_decoder = Decoder(dict[str, float])
 
 
 class GrowthRateCalculator(BackgroundJob):
@@ -71,6 +85,10 @@ class GrowthRateCalculator(BackgroundJob):
     """
 
     job_name = "growth_rate_calculating"
+    # latest growth rate and od_filtered are only persisted this often (and when the job disconnects). If the
+    # process dies without disconnecting, up to this many seconds of state is lost, and a restart resumes from
+    # slightly older values.
+    cache_write_interval_seconds = 5.0
     published_settings = {
         "growth_rate": {
             "datatype": "GrowthRate",
@@ -102,6 +120,12 @@ class GrowthRateCalculator(BackgroundJob):
     ):
         super(GrowthRateCalculator, self).__init__(unit=unit, experiment=experiment)
 
+        topic_prefix = f"pioreactor/{self.unit}/{self.experiment}"
+        self._ods_topic = f"{topic_prefix}/od_reading/ods"
+        self._od_interval_topic = f"{topic_prefix}/od_reading/interval"
+        self._od_update_interval_topic = f"{topic_prefix}/od_reading/update_interval"
+        self._dosing_events_topic = f"{topic_prefix}/dosing_events"
+
         self.source_obs_from_mqtt = source_obs_from_mqtt
         self.ignore_cache = ignore_cache
         self.time_of_previous_observation: datetime | None = None
@@ -110,6 +134,20 @@ class GrowthRateCalculator(BackgroundJob):
             "od_reading.config", "stats_samples_per_second", fallback=self.samples_per_second
         )
         self.expected_dt = 1 / (60 * 60 * self.samples_per_second)
+        # latest growth_rate / od_filtered are written to the cache at most every cache_write_interval_seconds.
+        self._cache_dirty = False
+        self._last_cache_write: float | None = None
+        # these don't change at runtime, so read them once rather than on every dosing event.
+        self.ukf_variance_shift_post_dosing_minutes = config.getfloat(
+            "growth_rate_calculating.config",
+            "ukf_variance_shift_post_dosing_minutes",
+            fallback=0.40,
+        )
+        self.ukf_variance_shift_post_dosing_factor = config.getfloat(
+            "growth_rate_calculating.config",
+            "ukf_variance_shift_post_dosing_factor",
+            fallback=2500,
+        )
 
     def on_ready(self) -> None:
         # Initialization when job is marked as READY.
@@ -120,12 +158,31 @@ class GrowthRateCalculator(BackgroundJob):
         if hasattr(self, "ukf"):
             return
 
+        import numpy as np
+
         try:
             (
                 self.od_normalization_factors,
                 self.od_variances,
                 self.od_blank,
             ) = self.get_precomputed_values()
+            # fixed channel order, used to read raw ODs out of each incoming ODReadings.
+            self.pd_channels = tuple(sorted(self.od_normalization_factors, reverse=True))
+            # per-channel blanks and scales, in pd_channels order, and a buffer reused between updates.
+            self._od_blanks = np.array([self.od_blank[c] for c in self.pd_channels], dtype=np.float64)
+            self._od_scales = (
+                np.array([self.od_normalization_factors[c] for c in self.pd_channels], dtype=np.float64)
+                - self._od_blanks
+            )
+            self._scaled_observations = np.empty(len(self.pd_channels), dtype=np.float64)
+            # constants of the observation noise model, which is driven by channel '1'.
+            if "1" not in self.pd_channels:
+                raise ValueError(
+                    f"Channel 1 is required for the observation noise model, but only channels {self.pd_channels} have normalization statistics."
+                )
+            self._noise_channel_index = self.pd_channels.index("1")
+            self._noise_exponent_factor = 7.0895 * self.od_normalization_factors["1"]
+            self._noise_scale = 1e-5 / self.od_normalization_factors["1"] ** 2
             (
                 self.initial_nOD,
                 self.initial_growth_rate,
@@ -267,9 +324,11 @@ class GrowthRateCalculator(BackgroundJob):
 
         try:
             # Adjust the sampling rate using MQTT
-            publish(
-                f"pioreactor/{self.unit}/{self.experiment}/od_reading/update_interval",
+            # reuse the job's connected client rather than opening a new connection per request.
+            self.pub_client.publish(
+                self._od_update_interval_topic,
                 str(1 / self.stats_samples_per_second),
+                qos=QOS.EXACTLY_ONCE,
             )
             self.logger.info("Published request to update sampling interval to stats_samples_per_second.")
 
@@ -287,19 +346,21 @@ class GrowthRateCalculator(BackgroundJob):
             self.logger.info("Completed OD normalization metrics.")
         finally:
             # Restore the original sampling interval using MQTT
-            publish(
-                f"pioreactor/{self.unit}/{self.experiment}/od_reading/update_interval",
+            # reuse the job's connected client rather than opening a new connection per request.
+            self.pub_client.publish(
+                self._od_update_interval_topic,
                 str(1 / self.samples_per_second),
+                qos=QOS.EXACTLY_ONCE,
             )
             self.logger.info("Published request to restore sampling interval to samples_per_second.")
 
         with local_persistant_storage("od_normalization_mean") as cache:
             if self.experiment not in cache:
-                cache[self.experiment] = dumps(means)
+                cache[self.experiment] = encode(means).decode()
 
         with local_persistant_storage("od_normalization_variance") as cache:
             if self.experiment not in cache:
-                cache[self.experiment] = dumps(variances)
+                cache[self.experiment] = encode(variances).decode()
 
         return means, variances
 
@@ -343,8 +404,7 @@ class GrowthRateCalculator(BackgroundJob):
             result = cache.get(self.experiment)
 
         if result is not None:
-            od_blanks = result
-            return loads(od_blanks)
+            return od_statistics_decoder.decode(result)
         else:
             return defaultdict(lambda: 0.0)
 
@@ -353,8 +413,6 @@ class GrowthRateCalculator(BackgroundJob):
             return cache.get(self.experiment, 0.0)     
 
     def get_filtered_od_from_cache_or_computed(self) -> float:
-        from statistics import mean
-
         with local_persistant_storage("od_filtered") as cache:
             if self.experiment in cache:
                 return cache[self.experiment]
@@ -363,24 +421,24 @@ class GrowthRateCalculator(BackgroundJob):
         # typically this should be near 1.0, but if the od_normalization_factors are very different (i.e. provided elsewhere.),
         # then this could be a different value.
         msg = subscribe(
-            f"pioreactor/{self.unit}/{self.experiment}/od_reading/ods",
+            self._ods_topic,
             allow_retained=True,  # maybe?
             timeout=10,
         )
         if msg is None:
             return 1.0  # default?
 
-        od_readings = decode(msg.payload, type=structs.ODReadings)
-        scaled_ods, updating_noise_covariance = self.scale_raw_observations(self._batched_raw_od_readings_to_dict(od_readings.ods))
+        od_readings = od_readings_decoder.decode(msg.payload)
+        scaled_ods, updating_noise_covariance = self.scale_raw_observations(od_readings.ods)
         assert scaled_ods is not None
-        return mean(scaled_ods.values())
+        return float(scaled_ods.mean())
 
     def get_od_normalization_from_cache(self) -> dict[pt.PdChannel, float]:
         # we check if we've computed mean stats
         with local_persistant_storage("od_normalization_mean") as cache:
             result = cache.get(self.experiment, None)
             if result is not None:
-                return loads(result)
+                return od_statistics_decoder.decode(result)
 
         self.logger.debug("od_normalization/mean not found in cache.")
         means, _ = self._compute_and_cache_od_statistics()
@@ -392,7 +450,7 @@ class GrowthRateCalculator(BackgroundJob):
         with local_persistant_storage("od_normalization_variance") as cache:
             result = cache.get(self.experiment, None)
             if result:
-                return loads(result)
+                return od_statistics_decoder.decode(result)
 
         self.logger.debug("od_normalization/mean not found in cache.")
         _, variances = self._compute_and_cache_od_statistics()
@@ -402,7 +460,7 @@ class GrowthRateCalculator(BackgroundJob):
     def update_ukf_variance_after_event(self, minutes: float, factor: float) -> None: #look into this
         if whoami.is_testing_env():
             msg = subscribe(  # needs to be pubsub.subscribe (ie not sub_client.subscribe) since this is called in a callback
-                f"pioreactor/{self.unit}/{self.experiment}/od_reading/interval",
+                self._od_interval_topic,
                 timeout=1.0,
             )
             if msg:
@@ -413,26 +471,29 @@ class GrowthRateCalculator(BackgroundJob):
         else:
             self.ukf.scale_OD_variance_for_next_n_seconds(factor, minutes * 60)
 
-    def scale_raw_observations(self, observations: dict[pt.PdChannel, float]) -> dict[pt.PdChannel, float]:
+    def scale_raw_observations(
+        self, observations: dict[pt.PdChannel, structs.ODReading]
+    ) -> tuple[np.ndarray, float]:
         """
         Scales the raw observations using normalization factors and blanks.
-        Accepts input where observations are nested dictionaries containing 'od'.
         this shif is for od_blank functionality specifically it is differenet than ADC offset used in OD_reading
-        """
-        def _scale_and_shift(obs, shift, scale) -> float:
-            return (obs - shift) / (scale - shift)
 
-        scaled_signals = {
-            channel: _scale_and_shift(
-                raw_signal, self.od_blank[channel], self.od_normalization_factors[channel]
+        The scaled values are returned in the order of `pd_channels`, in a buffer that is reused (overwritten) on the next call.
+        """
+        scaled_signals = self._scaled_observations
+        for i, channel in enumerate(self.pd_channels):
+            scaled_signals[i] = observations[channel].od
+        scaled_signals -= self._od_blanks
+        scaled_signals /= self._od_scales
+
+        # numpy doesn't raise on a zero scale, so also catch the resulting inf / nan here (nan fails the > 0 check).
+        if not ((scaled_signals > 0.0).all() and isfinite(scaled_signals.max())):
+            raise ValueError(
+                f"Negative or non-finite normalized value(s) observed: {dict(zip(self.pd_channels, scaled_signals.tolist()))}."
             )
-            for channel, raw_signal in observations.items()
-        }
 
-        if any(v <= 0.0 for v in scaled_signals.values()):
-            raise ValueError(f"Negative normalized value(s) observed: {scaled_signals}.")
-
-        updating_noise_covariance = (1e-5*np.exp(7.0895 * scaled_signals['1']*self.od_normalization_factors['1']))/(self.od_normalization_factors['1']**2)
+        scaled_signal_1 = float(scaled_signals[self._noise_channel_index])
+        updating_noise_covariance = self._noise_scale * exp(self._noise_exponent_factor * scaled_signal_1)
 
         return scaled_signals, updating_noise_covariance
 
@@ -442,7 +503,7 @@ class GrowthRateCalculator(BackgroundJob):
             return
 
         try:
-            od_readings = decode(message.payload, type=structs.ODReadings)
+            od_readings = od_readings_decoder.decode(message.payload)
             self.update_state_from_observation(od_readings)
         except DecodeError:
             self.logger.debug(f"Decode error in `{message.payload.decode()}` to structs.ODReadings")
@@ -468,23 +529,32 @@ class GrowthRateCalculator(BackgroundJob):
             # just return the previous data
             return self.growth_rate, self.od_filtered, self.kalman_filter_outputs, self.absolute_growth_rate, self.density
 
-        # save to cache
+        # save to cache. This is only read when the job restarts, so we don't need to write it on every reading.
+        self._cache_dirty = True
+        if (
+            self._last_cache_write is None
+            or monotonic() - self._last_cache_write >= self.cache_write_interval_seconds
+        ):
+            self._write_latest_state_to_cache()
+
+        return self.growth_rate, self.od_filtered, self.kalman_filter_outputs, self.absolute_growth_rate, self.density
+
+    def _write_latest_state_to_cache(self) -> None:
         with local_persistant_storage("growth_rate") as cache:
             cache[self.experiment] = self.growth_rate.growth_rate
 
         with local_persistant_storage("od_filtered") as cache:
             cache[self.experiment] = self.od_filtered.od_filtered
 
-        return self.growth_rate, self.od_filtered, self.kalman_filter_outputs, self.absolute_growth_rate, self.density
+        self._cache_dirty = False
+        self._last_cache_write = monotonic()
 
     def _update_state_from_observation(
         self, od_readings: structs.ODReadings
     ) -> tuple[structs.GrowthRate, structs.ODFiltered, structs.KalmanFilterOutput, structs.Density, structs.AbsoluteGrowthRate]:
         timestamp = od_readings.timestamp
 
-        scaled_observations, updating_noise_covariance = self.scale_raw_observations(
-            self._batched_raw_od_readings_to_dict(od_readings.ods)
-        )
+        scaled_observations, updating_noise_covariance = self.scale_raw_observations(od_readings.ods)
 
         if whoami.is_testing_env():
             # when running a mock script, we run at an accelerated rate, but want to mimic
@@ -506,7 +576,7 @@ class GrowthRateCalculator(BackgroundJob):
                 dt = 0.0
 
             self.time_of_previous_observation = timestamp
-        updated_state_, covariance_ = self.ukf.update(list(scaled_observations.values()), dt, updating_noise_covariance)
+        updated_state_, covariance_ = self.ukf.update(scaled_observations, dt, updating_noise_covariance)
         latest_od_filtered, latest_specific_growth_rate = float(updated_state_[0]), float(updated_state_[1])
         density_converted = self.od_to_density_converion*latest_od_filtered*self.od_normalization_factors['1']#unideal hardcoding the channel for now
         od_filtered = structs.ODFiltered(
@@ -534,7 +604,7 @@ class GrowthRateCalculator(BackgroundJob):
         return growth_rate, od_filtered, kf_outputs, absolute_growth_rate, density
 
     def respond_to_dosing_event_from_mqtt(self, message: pt.MQTTMessage) -> None:
-        dosing_event = decode(message.payload, type=structs.DosingEvent)
+        dosing_event = dosing_event_decoder.decode(message.payload)
         return self.respond_to_dosing_event(dosing_event)
 
     def respond_to_dosing_event(self, dosing_event: structs.DosingEvent) -> None:
@@ -542,64 +612,62 @@ class GrowthRateCalculator(BackgroundJob):
         # an improvement to this: the variance factor is proportional to the amount exchanged.
         if dosing_event.event != "remove_waste":
             self.update_ukf_variance_after_event(
-                minutes=config.getfloat(
-                    "growth_rate_calculating.config",
-                    "ukf_variance_shift_post_dosing_minutes",
-                    fallback=0.40,
-                ),
-                factor=config.getfloat(
-                    "growth_rate_calculating.config",
-                    "ukf_variance_shift_post_dosing_factor",
-                    fallback=2500,
-                ),
+                minutes=self.ukf_variance_shift_post_dosing_minutes,
+                factor=self.ukf_variance_shift_post_dosing_factor,
             )
 
+    def on_disconnected(self) -> None:
+        if self._cache_dirty:
+            self._write_latest_state_to_cache()
+
     def start_passive_listeners(self) -> None:
         # process incoming data
         self.subscribe_and_callback(
             self.respond_to_od_readings_from_mqtt,
-            f"pioreactor/{self.unit}/{self.experiment}/od_reading/ods",
+            self._ods_topic,
             qos=QOS.EXACTLY_ONCE,
             allow_retained=False,
         )
         self.subscribe_and_callback(
             self.respond_to_dosing_event_from_mqtt,
-            f"pioreactor/{self.unit}/{self.experiment}/dosing_events",
+            self._dosing_events_topic,
             qos=QOS.EXACTLY_ONCE,
             allow_retained=False,
         )
 
-    @staticmethod
-    def _batched_raw_od_readings_to_dict(
-        raw_od_readings: dict[pt.PdChannel, structs.ODReading]
-    ) -> dict[pt.PdChannel, pt.OD]:
-        """
-        Extract the od floats from ODReading but keep the same keys
-        """
-        return {channel: raw_od_readings[channel].od for channel in sorted(raw_od_readings, reverse=True)}
-
 
     def _yield_od_readings_from_mqtt(self) -> Generator[structs.ODReadings, None, None]:
+        # a single long-lived subscriber feeds a queue, rather than reconnecting to the broker for every reading.
+        readings: Queue[pt.MQTTMessage] = Queue()
+        client = subscribe_and_callback(
+            readings.put,
+            self._ods_topic,
+            allow_retained=False,
+            name=self.job_name,
+        )
         counter = 0
 
-        while True:
-            msg = subscribe(
-                f"pioreactor/{self.unit}/{self.experiment}/od_reading/ods",
-                allow_retained=False,
-                timeout=5,
-            )
+        try:
+            while True:
+                try:
+                    msg: pt.MQTTMessage | None = readings.get(timeout=5)
+                except Empty:
+                    msg = None
 
-            if self.state not in (self.READY, self.INIT):
-                raise StopIteration("Ending early.")
+                if self.state not in (self.READY, self.INIT):
+                    raise StopIteration("Ending early.")
 
-            if msg is None:
-                continue
+                if msg is None:
+                    continue
 
-            counter += 1
-            if counter <= 5:
-                continue  # skip the first few values. If users turn on growth_rate, THEN od_reading, we should ignore the noisiest part of od_reading.
+                counter += 1
+                if counter <= 5:
+                    continue  # skip the first few values. If users turn on growth_rate, THEN od_reading, we should ignore the noisiest part of od_reading.
 
-            yield decode(msg.payload, type=structs.ODReadings)
+                yield od_readings_decoder.decode(msg.payload)
+        finally:
+            client.loop_stop()
+            client.disconnect()
 
 
 @click.group(invoke_without_command=True, name="growth_rate_calculating")
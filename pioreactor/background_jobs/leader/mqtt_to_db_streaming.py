@@ -3,12 +3,13 @@ from __future__ import annotations
 
 import datetime
 import sqlite3
+from functools import lru_cache
 from json import dumps
-from json import loads
 from typing import Callable
 from typing import Optional
 
 import click
+from msgspec import DecodeError
 from msgspec import Struct
 from msgspec.json import decode as msgspec_loads
 
@@ -30,10 +31,10 @@ from pioreactor.whoami import UNIVERSAL_EXPERIMENT
 sqlite3.register_adapter(datetime.datetime, to_iso_format)
 
 
-class MetaData(Struct):
+class MetaData(Struct, frozen=True):
     pioreactor_unit: str
     experiment: str
-    rest_of_topic: list[str]
+    rest_of_topic: tuple[str, ...]
 
 
 class TopicToParserToTable(Struct):
@@ -71,8 +72,18 @@ class MqttToDBStreamer(LongRunningBackgroundJob):
         super().__init__(unit, experiment)
         self.logger.debug(f'Streaming MQTT data to {config["storage"]["database"]}.')
         self.sqliteworker = Sqlite3Worker(
-            config["storage"]["database"], max_queue_size=250, raise_on_error=False
+            config["storage"]["database"], max_queue_size=250, raise_on_error=False, max_commit_delay=0.5
         )
+        # match sqlite_configuration.sql. journal_mode is persisted in the database file, but the other
+        # pragmas only apply to the connection that sets them. Errors are swallowed, since raise_on_error=False.
+        for pragma in (
+            "PRAGMA journal_mode = WAL",
+            "PRAGMA synchronous = 1",  # aka NORMAL, recommended when using WAL
+            "PRAGMA temp_store = 2",  # use memory for temp tables and indices
+            "PRAGMA busy_timeout = 15000",
+            "PRAGMA cache_size = -20000",  # ~20MB of page cache
+        ):
+            self.sqliteworker.execute(pragma)
 
         self.logger.debug(f"Listening to {topics_to_tables}")
         topics_and_callbacks = [
@@ -102,6 +113,9 @@ class MqttToDBStreamer(LongRunningBackgroundJob):
         parser: Callable[[str, pt.MQTTMessagePayload], Optional[dict | list[dict]]],
         table: str,
     ) -> Callable:
+        # a parser produces the same columns message after message, so each INSERT statement is built once.
+        insert_sql_by_columns: dict[tuple[str, ...], str] = {}
+
         def callback(message: pt.MQTTMessage) -> None:
             if "/_testing_" in message.topic:
                 # filter out testing data from DB
@@ -113,6 +127,11 @@ class MqttToDBStreamer(LongRunningBackgroundJob):
 
             try:
                 new_rows = parser(message.topic, message.payload)
+            except DecodeError as e:
+                # e.g. NaN or Infinity tokens, which stdlib json accepts but msgspec does not.
+                self.logger.warning(f"Unable to decode payload from {message.topic}, so it was not saved to DB: {e}")
+                self.logger.debug(f"Payload that caused error: `{message.payload.decode()}`")
+                return
             except Exception as e:
                 self.logger.warning(f"Encountered error in saving to DB: {e}. See logs.")
                 self.logger.debug(
@@ -129,12 +148,14 @@ class MqttToDBStreamer(LongRunningBackgroundJob):
                 new_rows = [new_rows]
 
             for new_row in new_rows:
-                cols_placeholder = ", ".join(new_row.keys())
-                values_placeholder = ", ".join(":" + c for c in new_row.keys())
-                SQL = f"""INSERT INTO {table} ({cols_placeholder}) VALUES ({values_placeholder})"""
+                columns = tuple(new_row)
+                SQL = insert_sql_by_columns.get(columns)
+                if SQL is None:
+                    SQL = f"""INSERT INTO {table} ({", ".join(columns)}) VALUES ({", ".join("?" * len(columns))})"""
+                    insert_sql_by_columns[columns] = SQL
 
                 try:
-                    self.sqliteworker.execute(SQL, new_row)  # type: ignore
+                    self.sqliteworker.execute(SQL, tuple(new_row.values()))
                 except Exception as e:
                     self.logger.warning(e)
                     self.logger.debug(f"SQL that caused error: `{SQL}`")
@@ -153,19 +174,18 @@ class MqttToDBStreamer(LongRunningBackgroundJob):
             )
 
 
+@lru_cache(maxsize=1024)
 def produce_metadata(topic: str) -> MetaData:
-    # helper function for parsers below
+    # helper function for parsers below. The same few topics arrive over and over, so the parsed
+    # result is cached and shared between callers, so it is immutable.
     split_topic = topic.split("/")
-    return MetaData(split_topic[1], split_topic[2], split_topic[3:])
+    return MetaData(split_topic[1], split_topic[2], tuple(split_topic[3:]))
 
 
 def parse_od(topic: str, payload: pt.MQTTMessagePayload) -> dict:
     metadata = produce_metadata(topic)
     od_reading = msgspec_loads(payload, type=structs.ODReading)
 
-    from pioreactor.logging import create_logger
-    logger = create_logger("od_parse-testing")
-
     data = {
         "experiment": metadata.experiment,
         "pioreactor_unit": metadata.pioreactor_unit,
@@ -174,7 +194,6 @@ def parse_od(topic: str, payload: pt.MQTTMessagePayload) -> dict:
         "angle": int(od_reading.angle),
         "channel": int(od_reading.channel),
     }
-    logger.debug(data)
     return data
 
 
@@ -182,9 +201,6 @@ def parse_od_filtered(topic: str, payload: pt.MQTTMessagePayload) -> dict:
     metadata = produce_metadata(topic)
     od_reading = msgspec_loads(payload, type=structs.ODFiltered)
 
-    from pioreactor.logging import create_logger
-    logger = create_logger("od_filtered_parse-testing")
-
     data = {
         "experiment": metadata.experiment,
         "pioreactor_unit": metadata.pioreactor_unit,
@@ -192,15 +208,11 @@ def parse_od_filtered(topic: str, payload: pt.MQTTMessagePayload) -> dict:
         "normalized_od_reading": od_reading.od_filtered,
     }
 
-    logger.debug(data)
     return data
 def parse_density(topic: str, payload: pt.MQTTMessagePayload) -> dict:
     metadata = produce_metadata(topic)
     density = msgspec_loads(payload, type=structs.Density)
 
-    from pioreactor.logging import create_logger
-    logger = create_logger("density_parse-testing")
-
     data = {
         "experiment": metadata.experiment,
         "pioreactor_unit": metadata.pioreactor_unit,
@@ -208,7 +220,6 @@ def parse_density(topic: str, payload: pt.MQTTMessagePayload) -> dict:
         "density": density.density,
     }
 
-    logger.debug(data)
     return data
 
 def parse_od_blank(topic: str, payload: pt.MQTTMessagePayload) -> dict:
@@ -228,7 +239,7 @@ def parse_od_blank(topic: str, payload: pt.MQTTMessagePayload) -> dict:
 def parse_ir_led_intensity(topic: str, payload: pt.MQTTMessagePayload) -> dict:
     metadata = produce_metadata(topic)
 
-    payload_dict = loads(payload)
+    payload_dict = msgspec_loads(payload)
     return {
         "experiment": metadata.experiment,
         "pioreactor_unit": metadata.pioreactor_unit,
@@ -289,9 +300,6 @@ def parse_absolute_growth_rate(topic: str, payload: pt.MQTTMessagePayload) -> di
     metadata = produce_metadata(topic)
     agr = msgspec_loads(payload, type=structs.AbsoluteGrowthRate)
 
-    from pioreactor.logging import create_logger
-    logger = create_logger("absolute_growth_rate_parse-testing")
-
     data = {
         "experiment": metadata.experiment,
         "pioreactor_unit": metadata.pioreactor_unit,
@@ -299,7 +307,6 @@ def parse_absolute_growth_rate(topic: str, payload: pt.MQTTMessagePayload) -> di
         "absolute_growth_rate": agr.absolute_growth_rate,
     }
 
-    logger.debug(data)
     return data
 
 def parse_temperature(topic: str, payload: pt.MQTTMessagePayload) -> dict:
@@ -331,9 +338,6 @@ def parse_lightrod_temperatures(topic: str, payload: pt.MQTTMessagePayload) -> d
     metadata = produce_metadata(topic)
     lightrod_readings = msgspec_loads(payload, type=structs.LightRodTemperatures)
 
-    from pioreactor.logging import create_logger
-    logger = create_logger("lightrod_parse-testing")
-
     parsed_data = {
         "experiment": metadata.experiment,
         "pioreactor_unit": metadata.pioreactor_unit,
@@ -348,8 +352,6 @@ def parse_lightrod_temperatures(topic: str, payload: pt.MQTTMessagePayload) -> d
         parsed_data[f"{lightRod_channel}_bottom_temp"] = temp_data.bottom_temp
         parsed_data[f"{lightRod_channel}_timestamp"] = temp_data.timestamp
 
-    # logger.debug(parsed_data)
-
     return parsed_data
 
 def parse_max_lightrod_temperature(topic: str, payload: pt.MQTTMessagePayload) -> dict:
@@ -357,16 +359,12 @@ def parse_max_lightrod_temperature(topic: str, payload: pt.MQTTMessagePayload) -
     PlotLRTs = msgspec_loads(payload, type=structs.PlotLightRodTemperatures)
 
 
-
     parsed_data = {
         "experiment": metadata.experiment,
         "pioreactor_unit": str(metadata.pioreactor_unit) + "-" + PlotLRTs.channel,
         "timestamp": PlotLRTs.timestamp,  # Single timestamp for all readings
         "max_temperature": PlotLRTs.max_temp
     }
-    from pioreactor.logging import create_logger
-    logger = create_logger("max_lightrod_parse-testing")
-    logger.debug(f"Parsed LRT for plotting: {parsed_data}")
 
     return parsed_data
 
@@ -381,9 +379,6 @@ def parse_pbr_temperature(topic: str, payload: pt.MQTTMessagePayload) -> dict:
         "timestamp": temp.timestamp,
         "pbr_temperature": temp.temperature,
     }
-    from pioreactor.logging import create_logger
-    logger = create_logger("max_lightrod_parse-testing")
-    logger.debug(f"Parsed PBR TEMP: {parsed_data}")
 
     return parsed_data
 
@@ -415,7 +410,7 @@ def parse_automation_event(topic: str, payload: pt.MQTTMessagePayload) -> dict:
 
 def parse_alt_media_fraction(topic: str, payload: pt.MQTTMessagePayload) -> dict:
     metadata = produce_metadata(topic)
-    payload = loads(payload)
+    payload = msgspec_loads(payload)
 
     return {
         "experiment": metadata.experiment,
@@ -427,7 +422,7 @@ def parse_alt_media_fraction(topic: str, payload: pt.MQTTMessagePayload) -> dict
 
 def parse_liquid_volume(topic: str, payload: pt.MQTTMessagePayload) -> dict:
     metadata = produce_metadata(topic)
-    payload = loads(payload)
+    payload = msgspec_loads(payload)
 
     return {
         "experiment": metadata.experiment,
@@ -472,7 +467,7 @@ def parse_kalman_filter_outputs(topic: str, payload: pt.MQTTMessagePayload) -> d
 
 
 def parse_automation_settings(topic: str, payload: pt.MQTTMessagePayload) -> dict:
-    payload_dict = loads(payload)
+    payload_dict = msgspec_loads(payload)
     return payload_dict
 
 
@@ -490,7 +485,7 @@ def parse_stirring_rates(topic: str, payload: pt.MQTTMessagePayload) -> dict:
 
 def parse_pwm_dcs(topic: str, payload: pt.MQTTMessagePayload) -> dict:
     metadata = produce_metadata(topic)
-    pin_to_dc = loads(payload)
+    pin_to_dc = msgspec_loads(payload)
 
     return {
         "experiment": metadata.experiment,
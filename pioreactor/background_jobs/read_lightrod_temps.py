@@ -1,6 +1,8 @@
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import suppress
+from statistics import fmean
+from threading import Lock
 from time import sleep
-import numpy as np
 import json
 
 from pioreactor import exc
@@ -9,6 +11,7 @@ from pioreactor.hardware import LightRodTemp_ADDR
 from pioreactor.structs import LightRodTemperature
 from pioreactor.structs import LightRodTemperatures
 from pioreactor.structs import PlotLightRodTemperatures
+from pioreactor.utils import local_intermittent_storage
 from pioreactor.utils.temps import TMP1075
 from pioreactor.utils.timing import RepeatedTimer, current_utc_datetime
 from pioreactor.config import config
@@ -23,12 +26,18 @@ class ReadLightRodTemps(BackgroundJob):
         "lightrod_temps": {"datatype": "LightRodTemperatures", "settable": False},
     }
     TEMP_THRESHOLD = 40  # over-temperature warning level [degrees C]
+    TEMP_HYSTERESIS = 2  # an over-temperature sensor must cool this far below the warning level before it warns again [degrees C]
+    LED_CHANNEL = "B"  # LED channel turned off when a light rod is over temperature
 
     def __init__(self, unit: str, experiment: str, temp_thresh=TEMP_THRESHOLD) -> None:
         super(ReadLightRodTemps, self).__init__(unit=unit, experiment=experiment)
+        # sensors currently over temperature, so each one only logs a warning when it first crosses the threshold.
+        self._over_temp_sensors: set[TMP1075] = set()
+        self._over_temp_lock = Lock()
         self.initializeDrivers(LightRodTemp_ADDR)
         self.set_warning_threshold(temp_thresh)
         self.lightrod_temps = None  # initialize for mqtt broadcast
+        self._max_temp_topic = f"pioreactor/{self.unit}/{self.experiment}/{self.job_name}/max_lightrod_temp"
 
         dt = 1 / (config.getfloat("lightrod_temp_reading.config", "samples_per_second", fallback=0.033))
 
@@ -44,35 +53,41 @@ class ReadLightRodTemps(BackgroundJob):
             LightRod: [TMP1075(address=addr) for addr in addresses]
             for LightRod, addresses in addr_map.items()
         }
+        # top, middle and bottom sensors of every rod, in order.
+        self._rods = tuple(self.tmp_driver_map.keys())
+        self._sensors = tuple(driver for drivers in self.tmp_driver_map.values() for driver in drivers[:3])
+        self._read_pool = ThreadPoolExecutor(max_workers=max(len(self._sensors), 1))
+        # the sensors share one bus, so only one transaction at a time goes to it.
+        self._i2c_lock = Lock()
 
     def set_warning_threshold(self, temp_thresh):
         self.warning_threshold = temp_thresh
 
     def read_temps(self):
-        lightrod_dict = {}
-        for lightRod, drivers in self.tmp_driver_map.items():
-            temps = np.zeros(3)
-            for i in range(3):
-                temps[i] = self._read_average_temperature(drivers[i])
-
-            lightrod_dict[lightRod] = LightRodTemperature(
-                top_temp=float(round(temps[0], 2)),
-                middle_temp=float(round(temps[1], 2)),
-                bottom_temp=float(round(temps[2], 2)),
-                timestamp=current_utc_datetime(),
+        # all sensors are sampled concurrently, since most of the time is spent waiting for
+        # conversions rather than on the bus.
+        temps = [round(temp, 2) for temp in self._read_pool.map(self._read_average_temperature, self._sensors)]
+        # one timestamp for the whole set of readings.
+        timestamp = current_utc_datetime()
+
+        lightrod_dict = {
+            lightRod: LightRodTemperature(
+                top_temp=temps[3 * i],
+                middle_temp=temps[3 * i + 1],
+                bottom_temp=temps[3 * i + 2],
+                timestamp=timestamp,
             )
+            for i, lightRod in enumerate(self._rods)
+        }
         self.publish_max_temps(lightrod_dict)
         lightRod_temperatures = LightRodTemperatures(
-            timestamp=current_utc_datetime(),
+            timestamp=timestamp,
             temperatures=lightrod_dict,
         )
         # self.log_lightrod_temperatures(lightRod_temperatures)
         self.lightrod_temps = lightRod_temperatures
 
     def publish_max_temps(self, lightrod_dict):
-        unit = get_unit_name()
-        experiment = get_assigned_experiment_name(unit)
-
         for lightRod, lightRodTemp in lightrod_dict.items():
             self.logger.debug(f"Lightrod: {lightRod},  LRT: {lightRodTemp}")
             max_temp = max(lightRodTemp.top_temp, lightRodTemp.middle_temp, lightRodTemp.bottom_temp)
@@ -80,16 +95,15 @@ class ReadLightRodTemps(BackgroundJob):
 
             # Create PlotLightRodTemperatures object
             plotTemp = PlotLightRodTemperatures(
-                timestamp=current_utc_datetime(),
+                timestamp=lightRodTemp.timestamp,
                 channel=lightRod,
                 max_temp=max_temp
             )
 
             # Pass the object directly to publish
-            BackgroundJob.publish(
-                self,
-                topic=f"pioreactor/{unit}/{experiment}/read_lightrod_temps/max_lightrod_temp",
-                payload=plotTemp  # Publish as an object
+            self.publish(
+                self._max_temp_topic,
+                payload=plotTemp,  # Publish as an object
             )
 
     def log_lightrod_temperatures(self, lightRod_temperatures):
@@ -106,6 +120,8 @@ class ReadLightRodTemps(BackgroundJob):
     def on_disconnected(self) -> None:
         with suppress(AttributeError):
             self.read_lightrod_temperature_timer.cancel()
+        with suppress(AttributeError):
+            self._read_pool.shutdown(wait=False, cancel_futures=True)
 
     ########## Private & internal methods
 
@@ -113,13 +129,14 @@ class ReadLightRodTemps(BackgroundJob):
         """
         Read the current temperature from sensor, in Celsius
         """
-        running_sum, running_count = 0.0, 0
         try:
             # check temp is fast, let's do it a few times to reduce variance.
-            for i in range(6):
-                running_sum += driver.get_temperature()
-                running_count += 1
-                sleep(0.05)
+            # Only wait for the sensor's next conversion between samples.
+            samples = []
+            for _ in range(6):
+                with self._i2c_lock:
+                    samples.append(driver.get_temperature())
+                sleep(driver.CONVERSION_TIME)
 
         except OSError as e:
             self.logger.debug(e, exc_info=True)
@@ -127,21 +144,36 @@ class ReadLightRodTemps(BackgroundJob):
                 "Is the Light Rod connected to the I2C bus? Unable to find temperature sensor."
             )
 
-        averaged_temp = running_sum / running_count
-        self._check_if_exceeds_max_temp(averaged_temp)
+        averaged_temp = fmean(samples)
+        self._check_if_exceeds_max_temp(averaged_temp, driver)
 
         return averaged_temp
 
-    def _check_if_exceeds_max_temp(self, temp: float) -> bool:
-        if temp > self.warning_threshold:
+    def _are_leds_on(self) -> bool:
+        with local_intermittent_storage("leds") as cache:
+            return float(cache.get(self.LED_CHANNEL, 0.0)) > 0
+
+    def _check_if_exceeds_max_temp(self, temp: float, sensor: TMP1075) -> bool:
+        exceeds_max_temp = temp > self.warning_threshold
+
+        with self._over_temp_lock:
+            # only warn once per sensor, until it has cooled down again.
+            newly_over_temp = exceeds_max_temp and sensor not in self._over_temp_sensors
+            if exceeds_max_temp:
+                self._over_temp_sensors.add(sensor)
+            elif temp < self.warning_threshold - self.TEMP_HYSTERESIS:
+                self._over_temp_sensors.discard(sensor)
+
+        if newly_over_temp:
             self.logger.warning(
                 f"Temperature of light rod has exceeded {self.warning_threshold}℃ - currently {temp}℃. Some action will be taken maybe idk"
                 # TODO implement overtemperature correction action
             )
 
-            channel = 'B'
+        # the cut-off is checked on every over temperature reading, in case the LEDs were turned back on.
+        if exceeds_max_temp and self._are_leds_on():
             success = led_intensity(
-                {channel: 0},
+                {self.LED_CHANNEL: 0},
                 unit=self.unit,
                 experiment=self.experiment,
                 pubsub_client=self.pub_client,
@@ -151,7 +183,7 @@ class ReadLightRodTemps(BackgroundJob):
             if success:
                 self.logger.warning("lights were turned off due to high temp")
 
-        return temp > self.warning_threshold
+        return exceeds_max_temp
 
 
 # if __name__ == "__main__":
@@ -1,6 +1,4 @@
-import random
 from contextlib import suppress
-from time import sleep
 import numpy as np
 import json
 
@@ -24,7 +22,7 @@ class ReadPBRPH(BackgroundJob):
     }
 
 
-    def __init__(self, unit, experiment, upper_warning_threshold=6, lower_warning_threshold=8):
+    def __init__(self, unit, experiment, upper_warning_threshold=8, lower_warning_threshold=6):
         super().__init__(unit=unit, experiment=experiment)
         self.initializeDrivers(PH_ADDR)
         self.set_upper_warning_threshold(upper_warning_threshold)
@@ -43,6 +41,7 @@ class ReadPBRPH(BackgroundJob):
     def initializeDrivers(self, i2c_addr):
         self.driver = None
         # TODO implement pH probe drivers
+        self._rng = np.random.default_rng()  # placeholder readings, until the probe driver exists
 
     def set_upper_warning_threshold(self, ph_thresh):
         self.upper_warning_threshold = ph_thresh
@@ -73,13 +72,11 @@ class ReadPBRPH(BackgroundJob):
         """
         Read the current pH from sensor
         """
-        running_sum, running_count = 0.0, 0
         try:
             # check temp is fast, let's do it a few times to reduce variance.
-            for i in range(6):
-                running_sum += random.uniform(-5, 20)#self.driver.read_pH  # TODO temproary placeholder, set this correctly
-                running_count += 1
-                sleep(0.05)
+            # no pause between samples: there's no probe to wait on yet. Pace these by the probe's
+            # conversion time once its driver is implemented.
+            samples = self._rng.uniform(-5, 20, size=6)#self.driver.read_pH  # TODO temproary placeholder, set this correctly
 
         except OSError as e:
             self.logger.debug(e, exc_info=True)
@@ -87,7 +84,7 @@ class ReadPBRPH(BackgroundJob):
                 "Is the thermocouple connected to the I2C bus? Unable to find temperature sensor."
             )
 
-        averaged_pH = running_sum / running_count
+        averaged_pH = float(samples.mean())
         self._check_if_exceeds_pH_range(averaged_pH)
 
         return averaged_pH
@@ -103,7 +100,7 @@ class ReadPBRPH(BackgroundJob):
             )
             # TODO implement correction action
 
-        return ph > self.upper_warning_threshold and ph < self.lower_warning_threshold
+        return not (self.lower_warning_threshold <= ph <= self.upper_warning_threshold)
 
 
 @click.command(name="read_pbr_ph")
@@ -1,5 +1,4 @@
 from contextlib import suppress
-from time import sleep
 from pioreactor import exc
 from pioreactor.background_jobs.base import BackgroundJob
 from pioreactor.hardware import Thermocouple_ADDR
@@ -18,7 +17,7 @@ class ReadPBRTemp(BackgroundJob):
         'lower_warning_threshold': {'datatype': "float", "unit": "℃", "settable": True},
         "PBR_temp": {"datatype": "Temperature", "settable": False}
     }
-
+    FILTER_COEFFICIENT = 4  # MCP9600 digital filter strength, 0 (off) to 7
 
     def __init__(self, unit, experiment, upper_warning_threshold=35, lower_warning_threshold=18):
         super().__init__(unit=unit, experiment=experiment)
@@ -39,6 +38,8 @@ class ReadPBRTemp(BackgroundJob):
     def initializeDrivers(self, i2c_addr):
         self.mcp9600_driver = MCP9600(i2c_addr)
         self.mcp9600_driver.set_thermocouple_type('K')
+        # let the sensor's own filter reduce the variance of the hot junction reading.
+        self.mcp9600_driver.set_filter_coefficient(self.FILTER_COEFFICIENT)
 
     def set_upper_warning_threshold(self, temp_thresh):
         self.upper_warning_threshold = temp_thresh
@@ -69,13 +70,9 @@ class ReadPBRTemp(BackgroundJob):
         """
         Read the current temperature from sensor, in Celsius
         """
-        running_sum, running_count = 0.0, 0
         try:
-            # check temp is fast, let's do it a few times to reduce variance.
-            for i in range(6):
-                running_sum += self.mcp9600_driver.get_hot_junction_temperature()
-                running_count += 1
-                sleep(0.05)
+            # the sensor filters the reading itself (see FILTER_COEFFICIENT), so one read is enough.
+            temp = self.mcp9600_driver.get_hot_junction_temperature()
 
         except OSError as e:
             self.logger.debug(e, exc_info=True)
@@ -83,10 +80,9 @@ class ReadPBRTemp(BackgroundJob):
                 "Is the thermocouple connected to the I2C bus? Unable to find temperature sensor."
             )
 
-        averaged_temp = running_sum / running_count
-        self._check_if_exceeds_temp_range(averaged_temp)
+        self._check_if_exceeds_temp_range(temp)
 
-        return averaged_temp
+        return temp
 
     def _check_if_exceeds_temp_range(self, temp: float) -> bool:
         if temp > self.upper_warning_threshold:
@@ -1,6 +1,7 @@
 import csv
 import json
-from datetime import datetime, timezone
+from collections import defaultdict
+from datetime import datetime
 from statistics import mean, variance
 from pioreactor.utils import local_persistant_storage
 from pioreactor.background_jobs.growth_rate_calculating import GrowthRateCalculator
@@ -24,12 +25,15 @@ def load_od_readings(file_path):
 
 # Calculate OD statistics (mean and variance)
 def calculate_od_statistics(od_readings, num_samples):
-    channels = set([reading["channel"] for reading in od_readings])
+    # group the readings by channel in a single pass over the data
+    readings_per_channel = defaultdict(list)
+    for reading in od_readings:
+        readings_per_channel[reading["channel"]].append(reading["od"])
+
     mean_per_channel = {}
     variance_per_channel = {}
 
-    for channel in channels:
-        channel_readings = [reading["od"] for reading in od_readings if reading["channel"] == channel]
+    for channel, channel_readings in readings_per_channel.items():
         if len(channel_readings) < num_samples:
             raise ValueError(f"Not enough samples for channel {channel}. Required: {num_samples}, Found: {len(channel_readings)}")
         
@@ -68,8 +72,8 @@ def run_growth_rate_calculation_from_csv(csv_file_path, unit_name, num_samples):
 
     # Process OD readings and simulate the `update_state_from_observation` method
     for reading in od_readings:
-        # Convert timestamp to datetime object
-        timestamp = datetime.strptime(reading["timestamp"], "%Y-%m-%dT%H:%M:%S.%fZ").replace(tzinfo=timezone.utc)
+        # Convert timestamp to datetime object. The trailing Z parses to UTC.
+        timestamp = datetime.fromisoformat(reading["timestamp"])
         od_value = reading["od"]
 
         # Create a Dynamic_Offset_ODReadings object
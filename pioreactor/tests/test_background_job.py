@@ -130,6 +130,35 @@ def test_error_in_subscribe_and_callback_is_logged() -> None:
     assert "division by zero" in error_logs[0]["message"]
 
 
+def test_subscribe_and_callbacks_routes_each_topic_to_its_callback() -> None:
+    class TestJob(BackgroundJob):
+        job_name = "test_job"
+
+        def __init__(self, *args, **kwargs) -> None:
+            super(TestJob, self).__init__(*args, **kwargs)
+            self.received: list[tuple[str, bytes]] = []
+            self.start_passive_listeners()
+
+        def start_passive_listeners(self) -> None:
+            self.subscribe_and_callbacks(
+                {
+                    "pioreactor/testing/subscription/a": lambda msg: self.received.append(("a", msg.payload)),
+                    "pioreactor/testing/subscription/b": lambda msg: self.received.append(("b", msg.payload)),
+                }
+            )
+
+    experiment = "test_subscribe_and_callbacks_routes_each_topic_to_its_callback"
+
+    with TestJob(unit=get_unit_name(), experiment=experiment) as job:
+        pause()
+        publish("pioreactor/testing/subscription/a", "1", retain=False)
+        publish("pioreactor/testing/subscription/b", "2", retain=False)
+        pause()
+        pause()
+
+        assert sorted(job.received) == [("a", b"1"), ("b", b"2")]
+
+
 def test_what_happens_when_an_error_occurs_in_init_but_we_catch_and_disconnect() -> None:
     class TestJob(BackgroundJob):
         job_name = "testjob"
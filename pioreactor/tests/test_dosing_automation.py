@@ -1029,6 +1029,25 @@ def test_chemostat_from_cli() -> None:
     assert len(errors) == 0
 
 
+@pytest.mark.parametrize(
+    "settings",
+    [
+        ["--volume", "1.5", "--target-od"],  # odd number of arguments
+        ["--volume", "1.5", "target-od", "2.0"],  # setting name without `--`
+    ],
+)
+def test_malformed_automation_settings_from_cli(settings) -> None:
+    from pioreactor.cli.pio import pio
+
+    runner = CliRunner()
+    result = runner.invoke(
+        pio, ["run", "dosing_automation", "--automation-name", "chemostat", *settings]
+    )
+
+    assert result.exit_code == 2
+    assert "`--<setting> <value>` pairs" in result.output
+
+
 def test_pass_in_initial_alt_media_fraction() -> None:
     experiment = "test_pass_in_initial_alt_media_fraction"
     unit = get_unit_name()
@@ -1341,6 +1360,43 @@ def test_execute_io_action_errors() -> None:
             ca.execute_io_action(waste_ml=1.0, salty_media_ml=1.0)
 
 
+def test_execute_io_action_uses_pump_functions_attached_after_first_call() -> None:
+    experiment = "test_execute_io_action_uses_pump_functions_attached_after_first_call"
+
+    with Silent(unit=unit, experiment=experiment) as ca:
+        ca.execute_io_action(waste_ml=0.5, media_ml=0.5)
+
+        def add_salty_media_to_bioreactor(unit, experiment, ml, source_of_event, mqtt_client, logger) -> float:
+            return ml
+
+        ca.add_salty_media_to_bioreactor = add_salty_media_to_bioreactor  # type: ignore
+
+        result = ca.execute_io_action(waste_ml=0.5, salty_media_ml=0.5)
+        assert result["salty_media_ml"] == 0.5
+
+
+def test_execute_io_action_allows_zero_volume_for_pumps_without_a_function() -> None:
+    experiment = "test_execute_io_action_allows_zero_volume_for_pumps_without_a_function"
+
+    with Silent(unit=unit, experiment=experiment) as ca:
+        result = ca.execute_io_action(waste_ml=0.5, media_ml=0.5, foo_ml=0)
+        assert result["media_ml"] == 0.5
+        assert result["foo_ml"] == 0.0
+
+
+def test_execute_io_action_with_unknown_pump_moves_no_liquid() -> None:
+    experiment = "test_execute_io_action_with_unknown_pump_moves_no_liquid"
+
+    with Silent(unit=unit, experiment=experiment, initial_liquid_volume=14.0) as ca:
+        with pytest.raises(AttributeError):
+            ca.execute_io_action(waste_ml=1.0, media_ml=0.5, salty_media_ml=0.5)
+        pause()
+
+        assert ca.media_throughput == 0
+        assert ca.alt_media_throughput == 0
+        assert ca.liquid_volume == 14.0
+
+
 def test_timeout_in_run() -> None:
     unit = get_unit_name()
     experiment = "test_timeout_in_run"
@@ -27,7 +27,7 @@ def pause() -> None:
     time.sleep(0.5)
 
 
-def create_od_raw_batched_json(channels, voltages: list[float], angles, timestamp: str) -> bytes:
+def create_od_raw_batched(channels, voltages: list[float], angles, timestamp: str) -> structs.ODReadings:
     """
     channel is a list, elements from {1, 2}
     raw_signal is a list
@@ -41,7 +41,19 @@ def create_od_raw_batched_json(channels, voltages: list[float], angles, timestam
             od=voltage, angle=angle, timestamp=to_datetime(timestamp), channel=channel
         )
 
-    return encode(readings)
+    return readings
+
+
+def create_od_raw_batched_json(channels, voltages: list[float], angles, timestamp: str) -> bytes:
+    return encode(create_od_raw_batched(channels, voltages, angles, timestamp))
+
+
+def scale_raw_observations_by_channel(calc: GrowthRateCalculator, channels, voltages: list[float]) -> dict:
+    ods = create_od_raw_batched(
+        channels, voltages, ["90"] * len(channels), timestamp="2010-01-01T12:00:00.000000Z"
+    ).ods
+    scaled_observations, _ = calc.scale_raw_observations(ods)
+    return dict(zip(calc.pd_channels, scaled_observations.tolist()))
 
 
 class TestGrowthRateCalculating:
@@ -583,8 +595,7 @@ class TestGrowthRateCalculating:
 
         assert calc.od_normalization_factors == {"2": 0.8, "1": 0.5}
         assert calc.od_blank == {"2": 0.4, "1": 0.25}
-        results = calc.scale_raw_observations({"2": 1.0, "1": 0.6})
-        assert results is not None
+        results = scale_raw_observations_by_channel(calc, ["2", "1"], [1.0, 0.6])
         assert abs(results["2"] - 1.5) < 0.00001
         assert abs(results["1"] - 1.4) < 0.00001
         calc.clean_up()
@@ -675,8 +686,7 @@ class TestGrowthRateCalculating:
             pause()
             assert calc.od_normalization_factors == {"2": 0.8, "1": 0.5}
             assert calc.od_blank == {"2": 0.0, "1": 0.0}
-            results = calc.scale_raw_observations({"2": 1.0, "1": 0.6})
-            assert results is not None
+            results = scale_raw_observations_by_channel(calc, ["2", "1"], [1.0, 0.6])
             assert abs(results["2"] - 1.25) < 0.00001
             assert abs(results["1"] - 1.2) < 0.00001
 
@@ -701,7 +711,7 @@ class TestGrowthRateCalculating:
         )
 
         with GrowthRateCalculator(unit=unit, experiment=experiment) as calc:
-            assert calc.scale_raw_observations({"2": 2, "1": 0.5}) == {
+            assert scale_raw_observations_by_channel(calc, ["2", "1"], [2, 0.5]) == {
                 "2": 2.0,
                 "1": 0.25,
             }
@@ -757,6 +767,52 @@ class TestGrowthRateCalculating:
                 assert len(results) > 0
                 assert results[0][0].timestamp < results[1][0].timestamp < results[2][0].timestamp  # type: ignore
 
+    def test_throttled_cache_writes_are_flushed_on_disconnect(self) -> None:
+        unit = get_unit_name()
+        experiment = "test_throttled_cache_writes_are_flushed_on_disconnect"
+
+        with local_persistant_storage("od_normalization_mean") as cache:
+            cache[experiment] = json.dumps({"1": 0.5, "2": 0.8})
+
+        with local_persistant_storage("od_normalization_variance") as cache:
+            cache[experiment] = json.dumps({"1": 1e-6, "2": 1e-6})
+
+        publish(
+            f"pioreactor/{unit}/{experiment}/od_reading/ods",
+            create_od_raw_batched_json(
+                ["1", "2"], [0.5, 0.8], ["90", "135"], timestamp="2010-01-01T12:00:00.000000Z"
+            ),
+            retain=True,
+        )
+
+        with GrowthRateCalculator(unit=unit, experiment=experiment, source_obs_from_mqtt=False) as calc:
+            calc.cache_write_interval_seconds = 3600
+
+            # the first update is written right away
+            calc.update_state_from_observation(
+                create_od_raw_batched(
+                    ["1", "2"], [0.51, 0.81], ["90", "135"], timestamp="2010-01-01T12:00:05.000000Z"
+                )
+            )
+            with local_persistant_storage("od_filtered") as cache:
+                first_od_filtered = cache[experiment]
+            assert first_od_filtered == calc.od_filtered.od_filtered
+
+            # the second falls inside the write interval, so is only held in memory
+            calc.update_state_from_observation(
+                create_od_raw_batched(
+                    ["1", "2"], [0.6, 0.9], ["90", "135"], timestamp="2010-01-01T12:00:10.000000Z"
+                )
+            )
+            with local_persistant_storage("od_filtered") as cache:
+                assert cache[experiment] == first_od_filtered
+            assert calc.od_filtered.od_filtered != first_od_filtered
+
+        with local_persistant_storage("od_filtered") as cache:
+            assert cache[experiment] == calc.od_filtered.od_filtered
+        with local_persistant_storage("growth_rate") as cache:
+            assert cache[experiment] == calc.growth_rate.growth_rate
+
     def test_a_non_unity_initial_nOD_works(self) -> None:
         unit = get_unit_name()
         experiment = "test_a_non_unity_initial_nOD_works"
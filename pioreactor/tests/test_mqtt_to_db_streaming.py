@@ -268,7 +268,7 @@ def test_produce_metadata() -> None:
     v = m2db.produce_metadata("pioreactor/leader/exp1/this/is/a/test")
     assert v.pioreactor_unit == "leader"
     assert v.experiment == "exp1"
-    assert v.rest_of_topic == ["this", "is", "a", "test"]
+    assert v.rest_of_topic == ("this", "is", "a", "test")
 
 
 def test_table_does_not_exist_in_db_but_parser_exists() -> None:
@@ -307,3 +307,25 @@ def test_table_does_not_exist_in_db_but_parser_exists() -> None:
             t.clean_up()
 
         assert len(bucket) == 0
+
+
+def test_payload_that_fails_to_decode_is_logged_and_skipped() -> None:
+    unit = get_unit_name()
+    exp = "test_payload_that_fails_to_decode_is_logged_and_skipped"
+
+    parsers = [
+        m2db.TopicToParserToTable(
+            "pioreactor/+/+/dosing_automation/alt_media_fraction",
+            m2db.parse_alt_media_fraction,
+            "alt_media_fractions",
+        )
+    ]
+
+    with m2db.MqttToDBStreamer(unit, exp, parsers):
+        with collect_all_logs_of_level("WARNING", unit, exp) as bucket:
+            # stdlib json accepts NaN, msgspec does not.
+            publish(f"pioreactor/{unit}/{exp}/dosing_automation/alt_media_fraction", "NaN")
+            sleep(1)
+
+        assert len(bucket) == 1
+        assert "Unable to decode payload" in bucket[0]["message"]
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from unittest.mock import patch
+
+from pioreactor.actions.led_intensity import led_intensity
+from pioreactor.background_jobs.read_lightrod_temps import ReadLightRodTemps
+from pioreactor.utils import local_intermittent_storage
+from pioreactor.whoami import get_unit_name
+
+unit = get_unit_name()
+
+
+def led_b_intensity() -> float:
+    with local_intermittent_storage("leds") as cache:
+        return float(cache.get("B", 0.0))
+
+
+def test_second_light_rod_over_temperature_still_turns_off_leds() -> None:
+    experiment = "test_second_light_rod_over_temperature_still_turns_off_leds"
+    rod_a_sensor, rod_b_sensor = object(), object()
+
+    with patch.object(ReadLightRodTemps, "initializeDrivers"):
+        with ReadLightRodTemps(unit=unit, experiment=experiment, temp_thresh=40) as job:
+            led_intensity({"B": 50}, unit=unit, experiment=experiment)
+            assert job._check_if_exceeds_max_temp(45, rod_a_sensor)
+            assert led_b_intensity() == 0
+
+            # rod A is still over temperature when rod B overheats
+            led_intensity({"B": 50}, unit=unit, experiment=experiment)
+            assert job._check_if_exceeds_max_temp(45, rod_b_sensor)
+            assert led_b_intensity() == 0
+
+
+def test_leds_turned_back_on_while_over_temperature_are_turned_off_again() -> None:
+    experiment = "test_leds_turned_back_on_while_over_temperature_are_turned_off_again"
+    sensor = object()
+
+    with patch.object(ReadLightRodTemps, "initializeDrivers"):
+        with ReadLightRodTemps(unit=unit, experiment=experiment, temp_thresh=40) as job:
+            led_intensity({"B": 50}, unit=unit, experiment=experiment)
+            assert job._check_if_exceeds_max_temp(45, sensor)
+            assert led_b_intensity() == 0
+
+            # within the hysteresis band, the sensor is still considered over temperature
+            assert not job._check_if_exceeds_max_temp(39, sensor)
+
+            led_intensity({"B": 50}, unit=unit, experiment=experiment)
+            assert job._check_if_exceeds_max_temp(41, sensor)
+            assert led_b_intensity() == 0
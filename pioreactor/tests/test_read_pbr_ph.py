@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import pytest
+
+from pioreactor.background_jobs.read_pbr_ph import ReadPBRPH
+from pioreactor.whoami import get_unit_name
+
+unit = get_unit_name()
+
+
+@pytest.mark.parametrize(
+    "ph,out_of_range",
+    [
+        (5.99, True),
+        (6, False),
+        (8, False),
+        (8.01, True),
+    ],
+)
+def test_ph_range_check_boundaries_with_default_thresholds(ph, out_of_range) -> None:
+    experiment = "test_ph_range_check_boundaries_with_default_thresholds"
+
+    with ReadPBRPH(unit=unit, experiment=experiment) as job:
+        assert job.lower_warning_threshold == 6
+        assert job.upper_warning_threshold == 8
+        assert job._check_if_exceeds_pH_range(ph) is out_of_range
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import logging
+import sqlite3
+
+from pioreactor.utils.sqlite_worker import Sqlite3Worker
+
+
+def test_batched_inserts_keep_good_rows_and_report_bad_row(tmp_path, caplog) -> None:
+    db = str(tmp_path / "test.sqlite")
+    with sqlite3.connect(db) as conn:
+        conn.execute("CREATE TABLE readings (x INTEGER NOT NULL)")
+
+    worker = Sqlite3Worker(db)
+    with caplog.at_level(logging.WARNING, logger="pioreactor.utils.sqlite_worker"):
+        # the worker thread is idle, waiting on its queue, so run a batch directly.
+        worker._run_inserts("INSERT INTO readings (x) VALUES (?)", [(1,), (None,), (3,)])
+    worker.close()
+
+    with sqlite3.connect(db) as conn:
+        assert conn.execute("SELECT x FROM readings ORDER BY x").fetchall() == [(1,), (3,)]
+
+    assert len(caplog.records) == 1
+    assert "NOT NULL constraint failed" in caplog.records[0].getMessage()
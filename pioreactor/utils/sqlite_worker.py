@@ -21,13 +21,18 @@
 """Thread safe sqlite3 interface."""
 from __future__ import annotations
 
+import logging
 import sqlite3
 import threading
 import uuid
+from queue import Empty
 from queue import Queue
+from time import monotonic
 from typing import Any
 from typing import Optional
 
+LOGGER = logging.getLogger(__name__)
+
 
 class Sqlite3Worker(threading.Thread):
     """Sqlite thread safe object.
@@ -45,13 +50,21 @@ class Sqlite3Worker(threading.Thread):
         sql_worker.close()
     """
 
-    def __init__(self, file_name: str, max_queue_size: int = 100, raise_on_error: bool = True) -> None:
+    def __init__(
+        self,
+        file_name: str,
+        max_queue_size: int = 100,
+        raise_on_error: bool = True,
+        max_commit_delay: float = 0.0,
+    ) -> None:
         """Automatically starts the thread.
 
         Args:
             file_name: The name of the file.
             max_queue_size: The max queries that will be queued.
             raise_on_error: raise the exception on commit error
+            max_commit_delay: seconds that executes may wait to be committed together. 0 commits
+              as soon as the queue is empty.
         """
         threading.Thread.__init__(self, name=__name__)
         self.daemon = True
@@ -62,6 +75,7 @@ class Sqlite3Worker(threading.Thread):
         self._sql_queue: Queue[tuple[str, str, tuple]] = Queue(maxsize=max_queue_size)
         self._results: dict[str, list | str] = {}
         self._max_queue_size = max_queue_size
+        self._max_commit_delay = max_commit_delay
         self._raise_on_error = raise_on_error
         # Event that is triggered once the run_query has been executed.
         self._select_events: dict[str, Any] = {}
@@ -74,36 +88,115 @@ class Sqlite3Worker(threading.Thread):
     def run(self) -> None:
         """Thread loop.
 
-        This is an infinite loop.  The iter method calls self._sql_queue.get()
+        This is an infinite loop.  The loop calls self._sql_queue.get()
         which blocks if there are not values in the queue.  As soon as values
         are placed into the queue the process will continue.
 
         If many executes happen at once it will churn through them all before
         calling commit() to speed things up by reducing the number of times
-        commit is called.
+        commit is called. With a max_commit_delay, executes that arrive
+        within that window are also committed together, rather than one
+        commit (and fsync) each when they trickle in.
         """
 
         execute_count = 0
-        for token, query, values in iter(self._sql_queue.get, None):
+        last_commit = monotonic()
+        # an item taken off the queue while collecting a batch, that belongs to the next iteration.
+        carried: Optional[tuple[str, str, tuple]] = None
+        while True:
+            if carried is not None:
+                item, carried = carried, None
+            else:
+                try:
+                    # only wait on the queue for what is left of the window uncommitted executes may sit in.
+                    item = self._sql_queue.get(
+                        timeout=max(0.0, self._max_commit_delay - (monotonic() - last_commit))
+                        if execute_count
+                        else None
+                    )
+                except Empty:
+                    self._commit()
+                    execute_count = 0
+                    last_commit = monotonic()
+                    continue
+
+            token, query, values = item
             if query:
-                self._run_query(token, query, values)
-                execute_count += 1
+                if query.lower().strip().startswith("insert"):
+                    # inserts of the same statement that are already queued are run together.
+                    rows = [values]
+                    while len(rows) < self._max_queue_size:
+                        try:
+                            next_item = self._sql_queue.get_nowait()
+                        except Empty:
+                            break
+                        if next_item[1] != query:
+                            carried = next_item
+                            break
+                        rows.append(next_item[2])
+                    self._run_inserts(query, rows)
+                    execute_count += len(rows)
+                else:
+                    self._run_query(token, query, values)
+                    execute_count += 1
                 # Let the executes build up a little before committing to disk
                 # to speed things up and reduce the number of writes to disk.
-                if self._sql_queue.empty() or execute_count == self._max_queue_size:
-                    try:
-                        self._sqlite3_conn.commit()
-                        execute_count = 0
-                    except Exception as e:
-                        if self._raise_on_error:
-                            raise e
+                if execute_count >= self._max_queue_size or (
+                    carried is None
+                    and self._sql_queue.empty()
+                    and monotonic() - last_commit >= self._max_commit_delay
+                ):
+                    self._commit()
+                    execute_count = 0
+                    last_commit = monotonic()
             # Only close if the queue is empty.  Otherwise keep getting
             # through the queue until it's empty.
-            if self._close_event.is_set() and self._sql_queue.empty():
+            if self._close_event.is_set() and carried is None and self._sql_queue.empty():
                 self._sqlite3_conn.commit()
                 self._sqlite3_conn.close()
                 return
 
+    def _commit(self) -> None:
+        try:
+            self._sqlite3_conn.commit()
+        except Exception as e:
+            if self._raise_on_error:
+                raise e
+
+    def _run_inserts(self, query: str, rows: list[tuple]) -> None:
+        """Run the same insert for many rows, with one executemany.
+
+        The rows are run inside a savepoint, so that if any row fails the
+        whole batch is undone and retried row by row. A bad row then only
+        drops itself, like it would with individual executes.
+
+        Args:
+            query: A sql insert with ? placeholders for values.
+            rows: A tuple of values for each row.
+        """
+        if len(rows) == 1:
+            self._run_query("", query, rows[0])
+            return
+
+        try:
+            if not self._sqlite3_conn.in_transaction:
+                self._sqlite3_cursor.execute("BEGIN")
+            self._sqlite3_cursor.execute("SAVEPOINT batched_inserts")
+        except sqlite3.Error:
+            for values in rows:
+                self._run_query("", query, values)
+            return
+
+        try:
+            self._sqlite3_cursor.executemany(query, rows)
+        except sqlite3.Error:
+            self._sqlite3_cursor.execute("ROLLBACK TO batched_inserts")
+            self._sqlite3_cursor.execute("RELEASE batched_inserts")
+            for values in rows:
+                self._run_query("", query, values)
+        else:
+            self._sqlite3_cursor.execute("RELEASE batched_inserts")
+
     def _run_query(self, token: str, query: str, values: tuple) -> None:
         """Run a query.
 
@@ -133,8 +226,8 @@ class Sqlite3Worker(threading.Thread):
         else:
             try:
                 self._sqlite3_cursor.execute(query, values)
-            except sqlite3.Error:
-                pass
+            except sqlite3.Error as err:
+                LOGGER.warning("Query returned error: %s: %s: %s", query, values, err)
 
     def close(self) -> None:
         """Close down the thread."""
@@ -5,10 +5,12 @@ from json import dumps
 from math import sqrt
 from threading import Timer
 from typing import Optional
+from typing import TYPE_CHECKING
+
 from pioreactor.pubsub import create_client
-import numpy as np
-from filterpy.kalman import UnscentedKalmanFilter as UKF
-from filterpy.kalman import MerweScaledSigmaPoints
+
+if TYPE_CHECKING:
+    import numpy as np
 
 class ExponentialMovingAverage:
     """
@@ -209,6 +211,11 @@ class CultureGrowthUKF:
         kappa,
         mahalanobis_threshold
     ) -> None:
+        # numpy and filterpy (which pulls in scipy) are slow to import, and this module is also imported
+        # by od_reading, stirring and the automations for the EMA and PID classes, so import them here.
+        import numpy as np
+        from filterpy.kalman import MerweScaledSigmaPoints
+        from filterpy.kalman import UnscentedKalmanFilter as UKF
 
         #initial_state = np.asarray(initial_state)
 
@@ -249,6 +256,9 @@ class CultureGrowthUKF:
         dt = 1  #placeholder updated in predict step just to initialize ukf
         sigmas = MerweScaledSigmaPoints(n=3, alpha=alpha, beta=beta, kappa=kappa)
         self.ukf = UKF(dim_x=3, dim_z=1, fx=f, hx=h, dt=dt, points=sigmas)
+        # the innovation covariance S is 1x1 (dim_z=1), so the gain only needs its reciprocal.
+        # this replaces filterpy's default np.linalg.inv, which does an LU factorization on every update.
+        self.ukf.inv = np.reciprocal
         self.ukf.x = np.asarray(initial_state)
         # self.ukf.P = initial_covariance -> same as line below
         # self.ukf.R = observation_noise_covariance -> no longer using the dynamic model where this would have to be set. ill keed statistics running as normal as we need value for normalization still
@@ -259,7 +269,8 @@ class CultureGrowthUKF:
         
 
     
-    def update(self, observation_: list[float], dt: float, updating_noise_covariance: float):
+    def update(self, observation_: np.ndarray | list[float], dt: float, updating_noise_covariance: float):
+        import numpy as np
 
         observation = np.asarray(observation_)
         # assert observation.shape[0] == self.n_sensors, (observation, self.n_sensors)
@@ -307,7 +318,7 @@ class CultureGrowthUKF:
 
         if self.ukf.mahalanobis > self.mahalanobis_threshold:
             self.ukf.x = self.ukf.x_prior
-            self.ukf.p = self.ukf.P_prior
+            self.ukf.P = self.ukf.P_prior
 
         return self.ukf.x, self.ukf.P
 
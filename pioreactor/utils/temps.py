@@ -16,6 +16,9 @@ class TMP1075:
 
     TEMP_REGISTER = bytearray([0x00])
     CONFIG_REGISTER = bytearray([0x01])
+    # time between conversions at the power-on default rate (R1:R0 = 00 in the config register), in seconds.
+    # Reading faster than this returns the same conversion again.
+    CONVERSION_TIME = 0.0275
 
     def __init__(self, address: int = 0x4F):
         comm_port = I2C(hardware.SCL, hardware.SDA)
@@ -251,6 +254,18 @@ class MCP9600:
         """
         return self._mcp9600.get('THERMOCOUPLE_CONFIG').type_select
 
+    def set_filter_coefficient(self, coefficient):
+        """Set the digital filter coefficient applied to the hot junction temperature.
+
+        :param coefficient: From 0 (filter off) to 7 (maximum filtering)
+
+        """
+        self._mcp9600.set('THERMOCOUPLE_CONFIG', filter_coefficients=coefficient)
+
+    def get_filter_coefficient(self):
+        """Get the digital filter coefficient applied to the hot junction temperature."""
+        return self._mcp9600.get('THERMOCOUPLE_CONFIG').filter_coefficients
+
     def get_hot_junction_temperature(self):
         """Return the temperature measured by the attached thermocouple."""
         return self._mcp9600.get('HOT_JUNCTION').temperature